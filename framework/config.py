@@ -9,6 +9,7 @@ from typing import (
     get_origin,
     is_typeddict,
 )
+import functools
 import yaml
 from pathlib import Path
 from dataclasses import dataclass, fields, is_dataclass
@@ -29,16 +30,37 @@ from PySide6.QtWidgets import (
 )
 
 
-yaml.add_multi_representer(
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+YamlDumper.add_multi_representer(
     Path,
     lambda d, v: d.represent_scalar("!path", str(v.absolute())),
 )
-yaml.add_constructor(
+YamlLoader.add_constructor(
     "!path",
     lambda l, n: Path(l.construct_scalar(n)),
 )
 
 
+def load_yaml(text: str):
+    return yaml.load(text, YamlLoader)
+
+
+def dump_yaml(data) -> str:
+    return yaml.dump(data, Dumper=YamlDumper, sort_keys=False)
+
+
+@functools.cache
+def dataclass_field_types(cls: type) -> tuple[tuple[str, type], ...]:
+    return tuple(
+        (field.name, eval(field.type) if isinstance(field.type, str) else field.type)
+        for field in fields(cls)
+    )
+
+
 @dataclass
 class BaseConfig:
     enabled: bool = False
@@ -73,12 +95,18 @@ class TypeFieldEdit[T]:
             return t
 
     @staticmethod
-    def create[E](t: type[E]) -> TypeFieldEdit[E]:
+    @functools.cache
+    def resolve_type(t: type) -> tuple[type[TypeFieldEdit], type, str, tuple]:
         comment, extra_args = "", ()
         if get_origin(t) is Annotated:
             t, comment, *extra_args = get_args(t)
         idx_t = TypeFieldEdit.idx_type(t)
-        return TypeFieldEdit.edits[idx_t]().with_type(t, comment, extra_args)
+        return TypeFieldEdit.edits[idx_t], t, comment, tuple(extra_args)
+
+    @staticmethod
+    def create[E](t: type[E]) -> TypeFieldEdit[E]:
+        edit_type, t, comment, extra_args = TypeFieldEdit.resolve_type(t)
+        return edit_type().with_type(t, comment, extra_args)
 
     def with_type(self, t: type[T], comment: str, extra_args: tuple):
         self.t = t
@@ -237,6 +265,9 @@ class ListFieldEdit(QWidget, TypeFieldEdit[list]):
     changed = Signal()
 
     def init(self):
+        (self.item_type,) = get_args(self.t)
+        self.items: list[ListFieldEditItem] = []
+
         layout = QVBoxLayout()
         layout.setSizeConstraint(QVBoxLayout.SizeConstraint.SetFixedSize)
 
@@ -248,33 +279,28 @@ class ListFieldEdit(QWidget, TypeFieldEdit[list]):
         self.append_btn.clicked.connect(self.append)
 
     def set_value(self, value):
-        while self.layout().count() - 1 > len(value):
-            self.remove(0)
-        while self.layout().count() - 1 < len(value):
-            self.append()
-        for i in range(len(value)):
-            cast(
-                ListFieldEditItem,
-                self.layout().itemAt(i).widget(),
-            ).edit.set_value(value[i])
+        blocked = self.blockSignals(True)
+        try:
+            while len(self.items) > len(value):
+                self.remove(len(self.items) - 1)
+            while len(self.items) < len(value):
+                self.append()
+            for item, v in zip(self.items, value):
+                item.edit.set_value(v)
+        finally:
+            self.blockSignals(blocked)
+        self.changed.emit()
 
     def get_value(self):
-        ret = []
-        for i in range(self.layout().count() - 1):
-            ret.append(
-                cast(
-                    ListFieldEditItem,
-                    self.layout().itemAt(i).widget(),
-                ).edit.get_value()
-            )
-        return ret
+        return [item.edit.get_value() for item in self.items]
 
     def insert(self, idx: int):
         layout = cast(QVBoxLayout, self.layout())
 
-        widget = TypeFieldEdit.create(get_args(self.t)[0])
+        widget = TypeFieldEdit.create(self.item_type)
         wrapped_widget = ListFieldEditItem(widget)
         layout.insertWidget(idx, wrapped_widget)
+        self.items.insert(idx, wrapped_widget)
 
         widget.changed.connect(self.changed.emit)
         wrapped_widget.insert.connect(
@@ -286,9 +312,10 @@ class ListFieldEdit(QWidget, TypeFieldEdit[list]):
         self.changed.emit()
 
     def append(self):
-        self.insert(self.layout().count() - 1)
+        self.insert(len(self.items))
 
     def remove(self, idx: int):
+        self.items.pop(idx)
         w = self.layout().takeAt(idx).widget()
         w.setParent(None)
         w.deleteLater()
@@ -311,6 +338,9 @@ class DictFieldEdit(QWidget, TypeFieldEdit[dict]):
     changed = Signal()
 
     def init(self):
+        self.key_type, self.value_type = get_args(self.t)
+        self.items: list[DictFieldEditItem] = []
+
         layout = QVBoxLayout()
         layout.setSizeConstraint(QVBoxLayout.SizeConstraint.SetFixedSize)
 
@@ -322,36 +352,33 @@ class DictFieldEdit(QWidget, TypeFieldEdit[dict]):
         self.append_btn.clicked.connect(self.append)
 
     def set_value(self, value):
-        while self.layout().count() - 1 > len(value):
-            self.remove(0)
-        while self.layout().count() - 1 < len(value):
-            self.append()
-        for i, (k, v) in enumerate(value.items()):
-            item = cast(
-                DictFieldEditItem,
-                self.layout().itemAt(i).widget(),
-            )
-            item.key_edit.set_value(k)
-            item.value_edit.set_value(v)
+        blocked = self.blockSignals(True)
+        try:
+            while len(self.items) > len(value):
+                self.remove(len(self.items) - 1)
+            while len(self.items) < len(value):
+                self.append()
+            for item, (k, v) in zip(self.items, value.items()):
+                item.key_edit.set_value(k)
+                item.value_edit.set_value(v)
+        finally:
+            self.blockSignals(blocked)
+        self.changed.emit()
 
     def get_value(self):
-        ret = {}
-        for i in range(self.layout().count() - 1):
-            item = cast(
-                DictFieldEditItem,
-                self.layout().itemAt(i).widget(),
-            )
-            ret[item.key_edit.get_value()] = item.value_edit.get_value()
-        return ret
+        return {
+            item.key_edit.get_value(): item.value_edit.get_value()
+            for item in self.items
+        }
 
     def insert(self, idx: int):
         layout = cast(QVBoxLayout, self.layout())
 
-        kt, vt = get_args(self.t)
-        k_widget = TypeFieldEdit.create(kt)
-        v_widget = TypeFieldEdit.create(vt)
+        k_widget = TypeFieldEdit.create(self.key_type)
+        v_widget = TypeFieldEdit.create(self.value_type)
         wrapped_widget = DictFieldEditItem(k_widget, v_widget)
         layout.insertWidget(idx, wrapped_widget)
+        self.items.insert(idx, wrapped_widget)
 
         k_widget.changed.connect(self.changed.emit)
         v_widget.changed.connect(self.changed.emit)
@@ -364,9 +391,10 @@ class DictFieldEdit(QWidget, TypeFieldEdit[dict]):
         self.changed.emit()
 
     def append(self):
-        self.insert(self.layout().count() - 1)
+        self.insert(len(self.items))
 
     def remove(self, idx: int):
+        self.items.pop(idx)
         w = self.layout().takeAt(idx).widget()
         w.setParent(None)
         w.deleteLater()
@@ -380,6 +408,7 @@ class TypedDictFieldEdit(QWidget, TypeFieldEdit[_TypedDict]):
         layout = QVBoxLayout()
         layout.setSizeConstraint(QVBoxLayout.SizeConstraint.SetFixedSize)
 
+        self.field_edits: dict[str, TypeFieldEdit] = {}
         for k, t in self.t.__annotations__.items():
             field_layout = QHBoxLayout()
 
@@ -388,6 +417,7 @@ class TypedDictFieldEdit(QWidget, TypeFieldEdit[_TypedDict]):
 
             field_edit = TypeFieldEdit.create(t)
             field_layout.addWidget(field_edit)
+            self.field_edits[k] = field_edit
 
             layout.addLayout(field_layout)
 
@@ -396,18 +426,16 @@ class TypedDictFieldEdit(QWidget, TypeFieldEdit[_TypedDict]):
         self.setLayout(layout)
 
     def get_value(self):
-        d = {}
-        for i, k in enumerate(self.t.__annotations__.keys()):
-            d[k] = cast(
-                TypeFieldEdit, self.layout().itemAt(i).layout().itemAt(1).widget()
-            ).get_value()
-        return self.t(d)
+        return self.t({k: edit.get_value() for k, edit in self.field_edits.items()})
 
     def set_value(self, value):
-        for i, k in enumerate(self.t.__annotations__.keys()):
-            cast(
-                TypeFieldEdit, self.layout().itemAt(i).layout().itemAt(1).widget()
-            ).set_value(value[k])
+        blocked = self.blockSignals(True)
+        try:
+            for k, edit in self.field_edits.items():
+                edit.set_value(value[k])
+        finally:
+            self.blockSignals(blocked)
+        self.changed.emit()
 
 
 class DataclassFieldEdit(QWidget, TypeFieldEdit[DataclassType]):
@@ -417,15 +445,16 @@ class DataclassFieldEdit(QWidget, TypeFieldEdit[DataclassType]):
         layout = QVBoxLayout()
         layout.setSizeConstraint(QVBoxLayout.SizeConstraint.SetFixedSize)
 
-        for field in fields(self.t):
+        self.field_edits: dict[str, TypeFieldEdit] = {}
+        for name, field_type in dataclass_field_types(self.t):
             field_layout = QHBoxLayout()
 
-            name_label = QLabel(field.name)
+            name_label = QLabel(name)
             field_layout.addWidget(name_label)
 
-            field_type = eval(field.type) if isinstance(field.type, str) else field.type
             field_edit = TypeFieldEdit.create(field_type)
             field_layout.addWidget(field_edit)
+            self.field_edits[name] = field_edit
 
             layout.addLayout(field_layout)
 
@@ -434,18 +463,18 @@ class DataclassFieldEdit(QWidget, TypeFieldEdit[DataclassType]):
         self.setLayout(layout)
 
     def get_value(self):
-        d = {}
-        for i, field in enumerate(fields(self.t)):
-            d[field.name] = cast(
-                TypeFieldEdit, self.layout().itemAt(i).layout().itemAt(1).widget()
-            ).get_value()
-        return self.t(**d)
+        return self.t(
+            **{name: edit.get_value() for name, edit in self.field_edits.items()}
+        )
 
     def set_value(self, value):
-        for i, field in enumerate(fields(self.t)):
-            cast(
-                TypeFieldEdit, self.layout().itemAt(i).layout().itemAt(1).widget()
-            ).set_value(getattr(value, field.name))
+        blocked = self.blockSignals(True)
+        try:
+            for name, edit in self.field_edits.items():
+                edit.set_value(getattr(value, name))
+        finally:
+            self.blockSignals(blocked)
+        self.changed.emit()
 
 
 class UnionFieldEdit(QWidget, TypeFieldEdit[UnionType]):
@@ -476,6 +505,9 @@ class UnionFieldEdit(QWidget, TypeFieldEdit[UnionType]):
 
         self.setLayout(layout)
 
+        self.type_indices = {
+            get_origin(t) or t: i for i, t in enumerate(self.field_types)
+        }
         self.editors: dict[type, TypeFieldEdit] = {}
         for t in self.field_types:
             editor = TypeFieldEdit.create(t)
@@ -492,11 +524,14 @@ class UnionFieldEdit(QWidget, TypeFieldEdit[UnionType]):
         return cast(TypeFieldEdit, self.field_input.currentWidget()).get_value()
 
     def set_value(self, value):
-        origins = [get_origin(t) or t for t in self.field_types]
-        vt = TypeFieldEdit.idx_type(type(value))
-        idx = origins.index(vt)
-        self.type_selector.setCurrentIndex(idx)
-        self.editors[self.field_types[idx]].set_value(value)
+        blocked = self.blockSignals(True)
+        try:
+            idx = self.type_indices[TypeFieldEdit.idx_type(type(value))]
+            self.type_selector.setCurrentIndex(idx)
+            self.editors[self.field_types[idx]].set_value(value)
+        finally:
+            self.blockSignals(blocked)
+        self.changed.emit()
 
     def change_type_idx(self, idx):
         self.field_input.setCurrentIndex(idx)
@@ -522,28 +557,27 @@ class ConfigEdit(QWidget):
         layout.setSizeConstraint(QVBoxLayout.SizeConstraint.SetFixedSize)
 
         self.edits: dict[str, TypeFieldEdit] = {}
-        for field in fields(self.config_class):
+        for name, field_type in dataclass_field_types(self.config_class):
             field_layout = QHBoxLayout()
 
             name_layout = QVBoxLayout()
             name_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-            name_label = QLabel(field.name)
+            name_label = QLabel(name)
             name_layout.addWidget(name_label)
             field_layout.addLayout(name_layout)
 
-            field_type = eval(field.type) if isinstance(field.type, str) else field.type
             field_edit = TypeFieldEdit.create(field_type)
             cast(QWidget, field_edit).setSizePolicy(
                 QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed
             )
-            self.edits[field.name] = field_edit
+            self.edits[name] = field_edit
             field_layout.addWidget(field_edit)
 
             if field_edit.comment:
                 comment_label = QLabel(field_edit.comment)
                 name_layout.addWidget(comment_label)
             field_edit.changed.connect(self.changed.emit)
-            if field.name == "enabled":
+            if name == "enabled":
                 field_edit.changed.connect(self.enable_changed.emit)
 
             layout.addLayout(field_layout)
@@ -552,12 +586,11 @@ class ConfigEdit(QWidget):
 
     def load(self, config: BaseConfig):
         self.blockSignals(True)
-        for field in fields(self.config_class):
-            self.edits[field.name].set_value(getattr(config, field.name))
+        for name, edit in self.edits.items():
+            edit.set_value(getattr(config, name))
         self.blockSignals(False)
 
     def get(self):
-        d = {}
-        for field in fields(self.config_class):
-            d[field.name] = self.edits[field.name].get_value()
-        return self.config_class(**d)
+        return self.config_class(
+            **{name: edit.get_value() for name, edit in self.edits.items()}
+        )
@@ -9,42 +9,49 @@ import threading
 
 
 class Event(ABC):
+    __slots__ = ()
+
     tags: ClassVar[list[str]] = []
+    name: ClassVar[str] = "Event"
 
-    @property
-    def name(self):
-        return self.__class__.__name__
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.name = cls.__name__
 
     def agent_msg(self) -> HumanMessage | Sequence[HumanMessage] | None:
         return None
 
 
 class InvokeStartEvent(Event):
-    pass
+    __slots__ = ()
 
-@dataclass
+@dataclass(slots=True)
 class InvokeEndEvent(Event):
     input_msgs: list[BaseMessage]
     new_msgs: list[BaseMessage]
 
 
-@dataclass
+@dataclass(slots=True)
 class PlainEvent(Event):
     content: HumanMessage | Sequence[HumanMessage]
 
     def agent_msg(self):
         return self.content
 
-@dataclass
+@dataclass(slots=True)
 class PluginRefreshEvent(Event):
     sys_prompt: str
     tools: Sequence[BaseTool]
 
 
 class Task(ABC):
-    @property
-    def name(self):
-        return self.__class__.__name__
+    __slots__ = ()
+
+    name: ClassVar[str] = "Task"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.name = cls.__name__
 
     @abstractmethod
     async def execute(self) -> None:
@@ -62,7 +69,7 @@ class Task(ABC):
         return
 
 
-@dataclass
+@dataclass(slots=True)
 class NewTaskEvent(Event):
     old_task: Task | None
     new_task: Task
@@ -75,6 +82,7 @@ class NewTaskEvent(Event):
 class TaskManager:
     tasks: ClassVar[dict[str, tuple[Task, asyncio.Task]]] = {}
     event_callbacks: ClassVar[dict[str, Callable[[Event], None]]] = {}
+    callback_list: ClassVar[tuple[Callable[[Event], None], ...]] = ()
     cb_lock = threading.Lock()
 
     @classmethod
@@ -88,10 +96,11 @@ class TaskManager:
 
     @classmethod
     async def add_tasks_no_check(cls, tasks: list[Task]):
+        loop = asyncio.get_running_loop()
         for task in tasks:
             cls.tasks[task.name] = (
                 task,
-                asyncio.create_task(cls.task_wrapper(task)),
+                loop.create_task(cls.task_wrapper(task)),
             )
 
     @classmethod
@@ -117,32 +126,37 @@ class TaskManager:
         with cls.cb_lock:
             assert key not in cls.event_callbacks
             cls.event_callbacks[key] = cb
+            cls.callback_list = tuple(cls.event_callbacks.values())
 
     @classmethod
     def remove_callback(cls, key: str):
         with cls.cb_lock:
             cls.event_callbacks.pop(key, None)
+            cls.callback_list = tuple(cls.event_callbacks.values())
 
     @classmethod
     def trigger_event(cls, event: Event):
         for task, _ in cls.tasks.values():
             task.on_event(event)
-        with cls.cb_lock:
-            for cb in cls.event_callbacks.values():
+        for cb in cls.callback_list:
+            cb(event)
+
+    @classmethod
+    def trigger_events(cls, events: Sequence[Event]):
+        callbacks = cls.callback_list
+        for event in events:
+            for task, _ in cls.tasks.values():
+                task.on_event(event)
+            for cb in callbacks:
                 cb(event)
 
     @classmethod
     def task_execute_infos(cls) -> str | None:
-        info_lines =  list(
-            filter(
-                lambda x: x is not None,
-                [task.execute_info() for task, _ in cls.tasks.values()],
-            )
-        )
-        if len(info_lines):
-            aggregate_task_info = "Running Tasks:\n"
-            for line in info_lines:
-                aggregate_task_info += f"- {line}\n"
-            return aggregate_task_info
-        else:
-            return None
+        info_lines = [
+            f"- {info}\n"
+            for task, _ in cls.tasks.values()
+            if (info := task.execute_info()) is not None
+        ]
+        if info_lines:
+            return "Running Tasks:\n" + "".join(info_lines)
+        return None
@@ -1,5 +1,6 @@
 from __future__ import annotations
 from dataclasses import dataclass
+import functools
 import importlib.util
 import json
 import pathlib
@@ -7,8 +8,7 @@ from langchain_core.tools import tool, BaseTool
 from typing import Any, ClassVar, Literal, Self, Sequence
 import sys
 import inspect
-import yaml
-from .config import BaseConfig
+from .config import BaseConfig, load_yaml, dump_yaml
 from .worker import ThreadedWorker
 from .event import Task, Event, TaskManager, PluginRefreshEvent
 
@@ -21,12 +21,12 @@ class PluginTypeBase:
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class PluginReloadEvent(Event):
     plugin_class: type[BasePlugin]
 
 
-@dataclass
+@dataclass(slots=True)
 class PluginConfigUpdateEvent(Event):
     plugin_class: type[BasePlugin]
 
@@ -88,7 +88,7 @@ class BasePlugin:
     def load_config(cls):
         config_file = cls.root_dir() / "config.yaml"
         if config_file.exists():
-            config_dict = yaml.load(config_file.read_text("utf-8"), yaml.Loader)
+            config_dict = load_yaml(config_file.read_text("utf-8"))
             cls._config = cls.config_type()(**config_dict)
         else:
             cls.update_config(cls.config_type()())
@@ -105,7 +105,7 @@ class BasePlugin:
         if config == cls._config:
             return
         config_file = cls.root_dir() / "config.yaml"
-        config_file.write_text(yaml.dump(config.__dict__, sort_keys=False), "utf-8")
+        config_file.write_text(dump_yaml(config.__dict__), "utf-8")
         cls._config = config
         cls.trigger_event(PluginConfigUpdateEvent(cls))
 
@@ -166,6 +166,7 @@ class Tool:
 
 class PluginManager:
     plugin_classes: ClassVar[list[type[BasePlugin]]]
+    wrapped_tools: ClassVar[dict[tuple[type[Tool], BasePlugin], BaseTool]] = {}
 
     @classmethod
     def init(cls):
@@ -237,6 +238,16 @@ class PluginManager:
             )
         )
 
+    @staticmethod
+    @functools.cache
+    def prompt_resources() -> tuple[str, dict[str, str]]:
+        prompt_folder = pathlib.Path("prompts/zh-CN")
+        with (
+            (prompt_folder / "template.md").open(encoding="utf-8") as t_f,
+            (prompt_folder / "default_slots.json").open(encoding="utf-8") as d_f,
+        ):
+            return t_f.read(), json.load(d_f)
+
     @classmethod
     def create_system_prompt(cls):
         prompt_variables = {
@@ -244,13 +255,7 @@ class PluginManager:
             "marker_end": MARKER_END,
         }
 
-        prompt_folder = pathlib.Path("prompts/zh-CN")
-        with (
-            (prompt_folder / "template.md").open(encoding="utf-8") as t_f,
-            (prompt_folder / "default_slots.json").open(encoding="utf-8") as d_f,
-        ):
-            prompt_template = t_f.read()
-            prompt_comps: dict[str, str] = json.load(d_f)
+        prompt_template, default_slots = cls.prompt_resources()
 
         plugin_prompt_comps: list[dict[str, str]] = []
         for p in cls.loaded_plugins():
@@ -262,7 +267,7 @@ class PluginManager:
                     str_prompts[key] = data.read_text("utf-8")
             plugin_prompt_comps.append(str_prompts)
 
-        prompt_comps |= cls.merge_str_dict(plugin_prompt_comps)
+        prompt_comps = default_slots | cls.merge_str_dict(plugin_prompt_comps)
         for k, v in prompt_comps.items():
             prompt_template = prompt_template.replace(f"{{{{{k}}}}}", v)
         for k, v in prompt_variables.items():
@@ -273,9 +278,15 @@ class PluginManager:
     def refresh_agent_data(cls):
         system_prompt = cls.create_system_prompt()
 
-        tools: list[BaseTool] = []
+        wrapped_tools: dict[tuple[type[Tool], BasePlugin], BaseTool] = {}
         for p in cls.loaded_plugins():
-            tools.extend(t(p).langchain_wrap() for t in p.tools())
+            for t in p.tools():
+                key = (t, p)
+                if (wrapped := cls.wrapped_tools.get(key)) is None:
+                    wrapped = t(p).langchain_wrap()
+                wrapped_tools[key] = wrapped
+        cls.wrapped_tools = wrapped_tools
+        tools = list(wrapped_tools.values())
 
         cls.trigger_event(PluginRefreshEvent(system_prompt, tools))
 
@@ -298,22 +309,19 @@ class PluginManager:
         for p in cls.loaded_plugins():
             for title, infos in p.infos().items():
                 raw_infos.setdefault(title, []).append(infos)
-        md_structured_infos: dict[str, str] = {}
+        formated_infos: list[str] = []
         for title, group in raw_infos.items():
-            info_lines: list[str] = []
-            for d in group:
-                if None in d.keys():
-                    info_lines.append(str(d.pop(None)))
-            names = sum(
-                [list(d.keys()) for d in group],
-                [],
-            )
+            info_lines = [str(d[None]) for d in group if None in d]
+            names = [name for d in group for name in d.keys() if name is not None]
             assert len(names) == len(set(names))
-            for d in group:
-                for name, value in d.items():
-                    info_lines.append(f"- **{name}**: {value}")
-            md_structured_infos[title] = "\n".join(info_lines)
-        formated_infos = [f"{k}\n{v}" for k, v in md_structured_infos.items()]
+            info_lines.extend(
+                f"- **{name}**: {value}"
+                for d in group
+                for name, value in d.items()
+                if name is not None
+            )
+            if info_lines:
+                formated_infos.append(f"{title}\n" + "\n".join(info_lines))
         return formated_infos
 
     @classmethod
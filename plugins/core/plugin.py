@@ -18,14 +18,40 @@ from langchain_core.messages import (
     SystemMessage,
     HumanMessage,
     AIMessage,
+    AIMessageChunk,
     ToolMessage,
+    message_chunk_to_message,
 )
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode
 from langgraph.types import Command
-import operator
 import asyncio
+import json
+from collections import deque
 from dataclasses import dataclass, field
+from itertools import groupby
+
+
+REVISION_PROMPT_TEMPLATE = """请仔细分析所给的对话上下文和AI助手的回复（均进行了适当简化），从多个维度进行评估。
+评估内容包括但不限于：
+- 是否提及了相关行为而未调用对应工具？
+- 是否包含了复杂格式，而不是一段足够简洁的文字？
+- 是否脱离了其提示词中的行为规范？
+
+若回复内容恰当，直接返回`true`，若存在问题，返回具体的修改意见。
+
+AI助手提示词如下：
+{system_prompt}
+"""
+
+SUMMARY_PROMPT = """请将所给的对话记录（已进行了适当简化）总结为一段简洁的摘要。
+摘要需保留：
+- 用户透露的个人信息与偏好
+- 已经发生的重要事件及其结果
+- 尚未完成的约定或事项
+
+只返回摘要内容本身。
+"""
 
 
 def clearable_add(a: list, b: list | None):
@@ -34,8 +60,13 @@ def clearable_add(a: list, b: list | None):
     return a + b
 
 
+def extend_add(a: list, b: list):
+    a.extend(b)
+    return a
+
+
 class State(TypedDict):
-    presistent_messages: Annotated[list[BaseMessage], operator.add]
+    presistent_messages: Annotated[list[BaseMessage], extend_add]
     input_messages: Annotated[list[HumanMessage], clearable_add]
     new_messages: Annotated[list[BaseMessage], clearable_add]
     info_message: HumanMessage
@@ -68,17 +99,12 @@ class InfoMessage(TypedMessage):
     name = "Info"
 
     def __init__(self):
-        info_parts: list[str] = []
-
-        info_parts.extend(PluginManager.infos())
+        info_parts = PluginManager.infos()
 
-        task_infos = TaskManager.task_execute_infos()
-        if task_infos:
+        if task_infos := TaskManager.task_execute_infos():
             info_parts.append(task_infos)
 
-        info_msg = "\n\n".join(info_parts).strip()
-        if len(info_msg) == 0:
-            info_msg = "No Information now."
+        info_msg = "\n\n".join(info_parts).strip() or "No Information now."
         super().__init__(info_msg)
 
 
@@ -86,7 +112,11 @@ class RevisionMessage(TypedMessage):
     name = "Revision"
 
 
-@dataclass
+class SummaryMessage(TypedMessage):
+    name = "Summary"
+
+
+@dataclass(slots=True)
 class UserInputEvent(Event):
     tags = ["user"]
     text: str = ""
@@ -113,13 +143,13 @@ class UserInputEvent(Event):
         return UserMessage(parts)
 
 
-@dataclass
+@dataclass(slots=True)
 class SpeakEvent(Event):
     text: str
     msg_id: str
 
 
-@dataclass
+@dataclass(slots=True)
 class MarkerEvent(Event):
     marker: str
     data: str
@@ -139,34 +169,56 @@ class StreamMarkerParser:
     ):
         self.start_marker = start_marker
         self.end_marker = end_marker
+        self.start_head = start_marker[0]
+        self.end_head = end_marker[0]
 
-        self.buffer = ""
-        self.marker_buffer = ""
+        self.buffer: list[str] = []
+        self.marker_buffer: list[str] = []
+        self.markers: list[MarkerEvent] = []
         self.state = self.State.normal
         self.start_match_index = 0
         self.end_match_index = 0
 
     def process(self, s: str):
-        for c in s:
-            match self.state:
-                case self.State.normal:
-                    self.normal_process(c)
-                case self.State.in_start:
-                    self.in_start_process(c)
-                case self.State.in_marker:
-                    self.in_marker_process(c)
-                case self.State.in_end:
-                    self.in_end_process(c)
-        ret = self.buffer.strip()
-        self.buffer = ""
+        try:
+            i = 0
+            while i < len(s):
+                match self.state:
+                    case self.State.normal:
+                        j = s.find(self.start_head, i)
+                        if j == -1:
+                            self.buffer.append(s[i:])
+                            break
+                        self.buffer.append(s[i:j])
+                        i = j
+                        self.normal_process(s[i])
+                    case self.State.in_start:
+                        self.in_start_process(s[i])
+                    case self.State.in_marker:
+                        j = s.find(self.end_head, i)
+                        if j == -1:
+                            self.marker_buffer.append(s[i:])
+                            break
+                        self.marker_buffer.append(s[i:j])
+                        i = j
+                        self.in_marker_process(s[i])
+                    case self.State.in_end:
+                        self.in_end_process(s[i])
+                i += 1
+        finally:
+            if self.markers:
+                TaskManager.trigger_events(self.markers)
+                self.markers = []
+        ret = "".join(self.buffer)
+        self.buffer.clear()
         return ret
 
     def normal_process(self, c: str):
-        if c == self.start_marker[0]:
+        if c == self.start_head:
             self.state = self.State.in_start
             self.start_match_index = 1
         else:
-            self.buffer += c
+            self.buffer.append(c)
 
     def in_start_process(self, c: str):
         if c == self.start_marker[self.start_match_index]:
@@ -174,33 +226,38 @@ class StreamMarkerParser:
             if self.start_match_index == len(self.start_marker):
                 self.state = self.State.in_marker
         else:
-            self.buffer += self.start_marker[: self.start_match_index]
-            self.buffer += c
+            self.buffer.append(self.start_marker[: self.start_match_index])
+            self.buffer.append(c)
             self.state = self.State.normal
 
     def in_marker_process(self, c: str):
-        if c == self.end_marker[0]:
+        if c == self.end_head:
             self.end_match_index = 1
             self.state = self.State.in_end
         else:
-            self.marker_buffer += c
+            self.marker_buffer.append(c)
 
     def in_end_process(self, c: str):
         if c == self.end_marker[self.end_match_index]:
             self.end_match_index += 1
             if self.end_match_index == len(self.end_marker):
                 self.state = self.State.normal
-                name, data = self.marker_buffer.split(":", 1)
-                TaskManager.trigger_event(MarkerEvent(name, data))
-                self.marker_buffer = ""
+                name, data = "".join(self.marker_buffer).split(":", 1)
+                self.markers.append(MarkerEvent(name, data))
+                self.marker_buffer.clear()
         else:
-            self.marker_buffer += self.end_marker[: self.end_match_index]
-            self.marker_buffer += c
+            self.marker_buffer.append(self.end_marker[: self.end_match_index])
+            self.marker_buffer.append(c)
             self.state = self.State.in_marker
 
 
 class Agent:
-    def __init__(self, base_model: ChatOpenAI, enable_revision: bool):
+    def __init__(
+        self,
+        base_model: ChatOpenAI,
+        enable_revision: bool,
+        history_limit: int,
+    ):
         self.state = State(
             presistent_messages=[],
             input_messages=[],
@@ -209,32 +266,40 @@ class Agent:
 
         self.base_model = base_model
         self.enable_revision = enable_revision
+        self.history_limit = history_limit
+        self.compaction: tuple[int, asyncio.Task[str | None]] | None = None
 
-        self.message_queue = asyncio.Queue()
+        self.pending_messages: deque[HumanMessage] = deque()
+        self.message_ready = asyncio.Event()
 
         self.parser = StreamMarkerParser("[:", ":]")
 
         self.task: asyncio.Task = None
+        self.streamed_msg_id: str | None = None
+
+        self.system_prompt: str | None = None
+        self.tools: list[BaseTool] = []
 
     def start(self, system_prompt: str, tools: Sequence[BaseTool]):
+        if (
+            system_prompt == self.system_prompt
+            and len(tools) == len(self.tools)
+            and all(a is b for a, b in zip(tools, self.tools))
+            and self.task is not None
+            and not self.task.done()
+        ):
+            return False
         if self.task is not None:
             self.stop()
 
+        self.system_prompt = system_prompt
+        self.tools = list(tools)
+
         self.model = self.base_model.bind_tools(tools)
 
         self.decide_model_prompt = SystemMessage(system_prompt)
         self.revision_prompt = SystemMessage(
-            f"""请仔细分析所给的对话上下文和AI助手的回复（均进行了适当简化），从多个维度进行评估。
-        评估内容包括但不限于：
-        - 是否提及了相关行为而未调用对应工具？
-        - 是否包含了复杂格式，而不是一段足够简洁的文字？
-        - 是否脱离了其提示词中的行为规范？
-        
-        若回复内容恰当，直接返回`true`，若存在问题，返回具体的修改意见。
-        
-        AI助手提示词如下：
-        {system_prompt}
-        """
+            REVISION_PROMPT_TEMPLATE.format(system_prompt=system_prompt)
         )
         self.graph = self.create_graph(tools)
 
@@ -242,54 +307,55 @@ class Agent:
             self.task = ThreadedWorker.loop.create_task(self.run())
 
         ThreadedWorker.loop.call_soon_threadsafe(create_task)
+        return True
 
     def stop(self):
+        self.system_prompt = None
         if self.task is not None:
             self.task.cancel()
             self.task = None
+        if self.compaction is not None:
+            self.compaction[1].cancel()
+            self.compaction = None
+
+    def push_message(self, msg: HumanMessage):
+        ThreadedWorker.loop.call_soon_threadsafe(self.enqueue_message, msg)
+
+    def enqueue_message(self, msg: HumanMessage):
+        self.pending_messages.append(msg)
+        self.message_ready.set()
 
     async def preprocess(self, state: State):
         TaskManager.trigger_event(InvokeStartEvent())
 
-        messages: list[HumanMessage] = []
-        while not self.message_queue.empty():
-            new_msg = self.message_queue.get_nowait()
-            messages.append(new_msg)
-            # print(f"[add message] {type(new_msg)} {new_msg}\n")
+        messages = list(self.pending_messages)
+        self.pending_messages.clear()
+        self.message_ready.clear()
 
         return {
             "input_messages": messages,
-        }
-
-    async def set_info(self, state: State):
-        return {
             "info_message": InfoMessage(),
         }
 
     async def decide(self, state: State):
-        input_msgs = (
-            [self.decide_model_prompt]
-            + state["presistent_messages"]
-            + self.concat_msgs(
-                state["input_messages"]
-                + state["new_messages"]
-                + [state["info_message"]]
-            )
-            + state["revision_data"]
-        )
-
-        # msg = None
-        # async for chunk in self.model.astream(input_msgs):
-        #     text = self.parser.process(chunk.content)
-        #     if text:
-        #         TaskManager.trigger_event(SpeakEvent(text, chunk.id))
+        input_msgs = [
+            self.decide_model_prompt,
+            *state["presistent_messages"],
+            *self.concat_msgs(
+                [
+                    *state["input_messages"],
+                    *state["new_messages"],
+                    state["info_message"],
+                ]
+            ),
+            *state["revision_data"],
+        ]
 
-        #     if msg is None:
-        #         msg = chunk
-        #     else:
-        #         msg += chunk
         try:
-            msg = await self.model.ainvoke(input_msgs)
+            if self.enable_revision:
+                msg = await self.model.ainvoke(input_msgs)
+            else:
+                msg = await self.stream_decide(input_msgs)
         except Exception as e:
             print(e)
             print(input_msgs)
@@ -298,84 +364,83 @@ class Agent:
 
         return {"response": msg}
 
-    async def revision(self, state: State):
-        if not self.enable_revision:
-            return Command(
-                goto="pass_revision",
-                update={
-                    "revision_data": [],
-                    "new_messages": [state["response"]],
-                },
-            )
-
-        input_msgs = [self.revision_prompt]
-        msgs = []
-        for msg in self.concat_msgs(
-            state["input_messages"] + state["new_messages"] + [state["response"]]
-        ):
-            if isinstance(msg, AIMessage):
-                content_parts = ["[AI] " + msg.content.strip()]
-                for tc in msg.tool_calls:
-                    content_parts.append(f"\n<tool call: {tc['name']}>")
-                content = "\n".join(content_parts)
-            elif isinstance(msg, HumanMessage):
-                content_parts = []
-                for c in msg.content:
-                    if c["type"] == "text":
-                        content_parts.append(c["text"])
-                    elif c["type"] == "image_url":
-                        content_parts.append("<image>")
-                content = "\n".join(content_parts)
-            elif isinstance(msg, ToolMessage):
-                content = "[Tool] ..."
-            msgs.append(content)
-        input_msgs.append(HumanMessage("\n\n".join(msgs)))
-
-        ret = await self.base_model.ainvoke(input_msgs)
-        print(f"[revision] {ret}\n")
-
-        if "true" in ret.content:
-            return Command(
-                goto="pass_revision",
-                update={
-                    "revision_data": [],
-                    "new_messages": [state["response"]],
-                },
-            )
-        else:
-            return Command(
-                goto="decide",
-                update={
-                    "revision_data": [
-                        state["response"],
-                        RevisionMessage(ret.content),
-                    ],
-                },
-            )
+    async def stream_decide(self, input_msgs: list[BaseMessage]):
+        msg: AIMessageChunk | None = None
+        spoken = False
+        async for chunk in self.model.astream(input_msgs):
+            msg = chunk if msg is None else msg + chunk
+            text = self.parser.process(chunk.content)
+            if not spoken:
+                text = text.lstrip()
+            if text:
+                spoken = True
+                TaskManager.trigger_event(SpeakEvent(text, chunk.id))
+        self.streamed_msg_id = msg.id
+        return message_chunk_to_message(msg)
 
-    async def pass_revision(self, state: State):
-        new_msg = state["new_messages"][-1]
-        text = self.parser.process(new_msg.content)
-        TaskManager.trigger_event(SpeakEvent(text, new_msg.id))
+    async def revision(self, state: State):
+        response = state["response"]
+        if self.enable_revision and response.content and not response.tool_calls:
+            input_msgs = [
+                self.revision_prompt,
+                HumanMessage(
+                    self.render_msgs(
+                        self.concat_msgs(
+                            [
+                                *state["input_messages"],
+                                *state["new_messages"],
+                                response,
+                            ]
+                        )
+                    )
+                ),
+            ]
+
+            ret = await self.base_model.ainvoke(input_msgs)
+            print(f"[revision] {ret}\n")
+
+            if "true" not in ret.content:
+                return Command(
+                    goto="decide",
+                    update={
+                        "revision_data": [
+                            response,
+                            RevisionMessage(ret.content),
+                        ],
+                    },
+                )
+
+        self.speak(response)
+        return Command(
+            goto="tools" if response.tool_calls else "postprocess",
+            update={
+                "revision_data": [],
+                "new_messages": [response],
+            },
+        )
 
-    async def tool_check(self, state: State):
-        if cast(AIMessage, state["new_messages"][-1]).tool_calls:
-            return True
-        return False
+    def speak(self, msg: AIMessage):
+        if msg.id == self.streamed_msg_id:
+            return
+        text = self.parser.process(msg.content).strip()
+        TaskManager.trigger_event(SpeakEvent(text, msg.id))
 
     async def process_artifact(self, state: State):
         msg = state["new_messages"][-1]
         assert isinstance(msg, ToolMessage)
 
-        if msg.artifact:
-            if isinstance(msg.artifact, HumanMessage):
-                return {"new_messages": [msg.artifact]}
+        update = {"info_message": InfoMessage()}
+        if isinstance(msg.artifact, HumanMessage):
+            update["new_messages"] = [msg.artifact]
+        return update
 
     async def postprocess(self, state: State):
         # new_presistent_messages = [
         #     msg for msg in state["input_messages"] if isinstance(msg, UserMessage)
         # ] + state["new_messages"]
-        new_presistent_messages = state["input_messages"] + state["new_messages"]
+        new_presistent_messages = self.concat_msgs(
+            [*state["input_messages"], *state["new_messages"]]
+        )
 
         TaskManager.trigger_event(
             InvokeEndEvent(
@@ -394,54 +459,132 @@ class Agent:
         builder = StateGraph(State)
 
         builder.add_node("preprocess", self.preprocess)
-        builder.add_node("info", self.set_info)
         builder.add_node("decide", self.decide)
         builder.add_node("revision", self.revision)
-        builder.add_node("pass_revision", self.pass_revision)
         builder.add_node("tools", ToolNode(tools, messages_key="new_messages"))
         builder.add_node("artifact", self.process_artifact)
         builder.add_node("postprocess", self.postprocess)
 
         builder.add_edge(START, "preprocess")
-        builder.add_edge("preprocess", "info")
-        builder.add_edge("info", "decide")
+        builder.add_edge("preprocess", "decide")
         builder.add_edge("decide", "revision")
-        builder.add_conditional_edges(
-            "pass_revision", self.tool_check, {True: "tools", False: "postprocess"}
-        )
         builder.add_edge("tools", "artifact")
-        builder.add_edge("artifact", "info")
+        builder.add_edge("artifact", "decide")
         builder.add_edge("postprocess", END)
 
         return builder.compile()
 
+    def start_compaction(self):
+        history = self.state["presistent_messages"]
+        if (
+            self.compaction is not None
+            or self.history_limit <= 0
+            or len(history) <= self.history_limit
+        ):
+            return
+
+        for split in range(len(history) - self.history_limit // 2, len(history)):
+            prev_msg = history[split - 1]
+            if (
+                isinstance(prev_msg, AIMessage)
+                and not prev_msg.tool_calls
+                and isinstance(history[split], HumanMessage)
+            ):
+                break
+        else:
+            return
+
+        self.compaction = (
+            split,
+            asyncio.create_task(self.summarize(history[:split])),
+        )
+
+    async def summarize(self, msgs: list[BaseMessage]):
+        try:
+            summary = await self.base_model.ainvoke(
+                [
+                    SystemMessage(SUMMARY_PROMPT),
+                    HumanMessage(self.render_msgs(msgs)),
+                ]
+            )
+        except Exception as e:
+            print(e)
+            return None
+        print(f"[summary] {summary}\n")
+        return summary.content
+
+    def apply_compaction(self):
+        if self.compaction is None or not self.compaction[1].done():
+            return
+        split, task = self.compaction
+        self.compaction = None
+
+        if (summary := task.result()) is None:
+            return
+        history = self.state["presistent_messages"]
+        self.state["presistent_messages"] = self.concat_msgs(
+            [SummaryMessage(summary), *history[split:]]
+        )
+
+    @staticmethod
+    def render_msgs(msgs: Sequence[BaseMessage]):
+        rendered: list[str] = []
+        for msg in msgs:
+            if isinstance(msg, AIMessage):
+                content_parts = ["[AI] " + msg.content.strip()]
+                for tc in msg.tool_calls:
+                    content_parts.append(f"\n<tool call: {tc['name']}>")
+                content = "\n".join(content_parts)
+            elif isinstance(msg, HumanMessage):
+                content_parts = []
+                for c in msg.content:
+                    if c["type"] == "text":
+                        content_parts.append(c["text"])
+                    elif c["type"] == "image_url":
+                        content_parts.append("<image>")
+                content = "\n".join(content_parts)
+            elif isinstance(msg, ToolMessage):
+                content = "[Tool] ..."
+            rendered.append(content)
+        return "\n\n".join(rendered)
+
+    @staticmethod
+    def human_msg_parts(msg: HumanMessage):
+        if isinstance(msg.content, str):
+            return [{"type": "text", "text": msg.content}]
+        elif isinstance(msg.content, list):
+            return msg.content
+        raise Exception("unknown content type:", type(msg.content))
+
     @staticmethod
     def concat_msgs(msgs: Sequence[BaseMessage]):
         concated_msgs: list[BaseMessage] = []
-        last_human_msg_data: list[dict] = []
-        for msg in msgs:
-            if isinstance(msg, HumanMessage):
-                if isinstance(msg.content, str):
-                    last_human_msg_data.append({"type": "text", "text": msg.content})
-                elif isinstance(msg.content, list):
-                    last_human_msg_data.extend(msg.content)
-                else:
-                    raise Exception("unknown content type:", type(msg.content))
+        for is_human, group in groupby(
+            msgs, key=lambda msg: isinstance(msg, HumanMessage)
+        ):
+            if is_human:
+                concated_msgs.append(
+                    HumanMessage(
+                        [
+                            part
+                            for msg in group
+                            for part in Agent.human_msg_parts(msg)
+                        ]
+                    )
+                )
             else:
-                if len(last_human_msg_data) != 0:
-                    concated_msgs.append(HumanMessage(last_human_msg_data))
-                    last_human_msg_data.clear()
-                concated_msgs.append(msg)
-        if len(last_human_msg_data) != 0:
-            concated_msgs.append(HumanMessage(last_human_msg_data))
+                concated_msgs.extend(group)
         return concated_msgs
 
     async def run(self):
         try:
             while True:
-                while self.message_queue.empty():
-                    await asyncio.sleep(0.5)
-                self.state = await self.graph.ainvoke(self.state, stream_mode="values")
+                await self.message_ready.wait()
+                self.apply_compaction()
+                self.state = await self.graph.ainvoke(
+                    self.state, stream_mode="values"
+                )
+                self.start_compaction()
         except asyncio.CancelledError:
             pass
 
@@ -455,23 +598,49 @@ class Config(BaseConfig):
     frequency_penalty: float = 1.0
     extra_config: dict[str, str | bool | int | float] | None = None
     enable_revision: bool = False
+    history_limit: Annotated[
+        int, "Summarize history beyond N messages (0 = off)", 0, 10000
+    ] = 0
 
 
 class Plugin(BasePlugin):
+    base_model_cache: ClassVar[tuple[str, ChatOpenAI] | None] = None
+
     def init(self):
         config = cast(Config, self.get_config())
         self.agent = Agent(
-            ChatOpenAI(
-                base_url=config.base_url,
-                api_key=config.api_key,
-                model=config.model,
-                temperature=config.temperature,
-                frequency_penalty=config.frequency_penalty,
-                extra_body=config.extra_config,
-            ),
+            self.base_model(config),
             config.enable_revision,
+            config.history_limit,
         )
 
+    @classmethod
+    def base_model(cls, config: Config):
+        key = json.dumps(
+            [
+                config.base_url,
+                config.api_key,
+                config.model,
+                config.temperature,
+                config.frequency_penalty,
+                config.extra_config,
+            ],
+            sort_keys=True,
+        )
+        if cls.base_model_cache is None or cls.base_model_cache[0] != key:
+            cls.base_model_cache = (
+                key,
+                ChatOpenAI(
+                    base_url=config.base_url,
+                    api_key=config.api_key,
+                    model=config.model,
+                    temperature=config.temperature,
+                    frequency_penalty=config.frequency_penalty,
+                    extra_body=config.extra_config,
+                ),
+            )
+        return cls.base_model_cache[1]
+
     def clear(self):
         self.agent.stop()
 
@@ -482,13 +651,13 @@ class Plugin(BasePlugin):
                 msgs = [msgs]
             for msg in msgs:
                 # print(f"[put message] {type(e)} {type(msg)} {msg}\n")
-                self.agent.message_queue.put_nowait(msg)
+                self.agent.push_message(msg)
 
         match e:
             case PluginRefreshEvent(prompt, tools):
-                open(
-                    self.root_dir() / "test_last_prompt.md",
-                    "w",
-                    encoding="utf-8",
-                ).write(prompt)
-                self.agent.start(prompt, tools)
+                if self.agent.start(prompt, tools):
+                    open(
+                        self.root_dir() / "test_last_prompt.md",
+                        "w",
+                        encoding="utf-8",
+                    ).write(prompt)
@@ -31,35 +31,40 @@ class DragEventFilter(QObject):
 
 
 class DragEvent(Event):
+    __slots__ = ()
+
     tags = ["move", "user"]
 
 
 class DragStartEvent(DragEvent):
+    __slots__ = ()
+
     def agent_msg(self):
         return EventMessage("You got picked up!")
 
 
 class DragEndEvent(DragEvent):
+    __slots__ = ()
+
     def agent_msg(self):
         return EventMessage("You’ve been put down.")
 
 
 class DragTask(Task):
-    check_interval = 0.02
+    __slots__ = ("finished",)
 
     def __init__(self):
-        self.running = True
+        self.finished = asyncio.Event()
 
     async def execute(self):
-        while self.running:
-            await asyncio.sleep(self.check_interval)
+        await self.finished.wait()
 
     def execute_info(self):
         return "You are being dragged..."
 
     def on_event(self, event):
         if isinstance(event, DragEndEvent):
-            self.running = False
+            self.finished.set()
 
 
 @dataclass
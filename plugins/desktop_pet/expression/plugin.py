@@ -11,7 +11,7 @@ from plugins.desktop_pet.pet_state.plugin import (
 from PySide6.QtCore import QTimer
 
 
-@dataclass
+@dataclass(slots=True)
 class ExpressionSetEvent(Event):
     expression: str
 
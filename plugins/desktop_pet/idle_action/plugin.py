@@ -5,11 +5,12 @@ import asyncio
 from dataclasses import dataclass
 import math
 import random
+import numpy as np
 from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 
 
-@dataclass
+@dataclass(slots=True)
 class WanderEvent(Event):
     tags = ["move"]
 
@@ -17,6 +18,8 @@ class WanderEvent(Event):
 
 
 class WanderTask(Task):
+    __slots__ = ("target", "init_pos", "progress", "speed", "running")
+
     interval = 0.02
 
     def __init__(self, init_pos: tuple[int, int], target: tuple[int, int]):
@@ -40,22 +43,29 @@ class WanderTask(Task):
             self.running = False
 
     async def execute(self):
-        dx = self.target[0] - self.init_pos[0]
-        dy = self.target[1] - self.init_pos[1]
-        distance = math.hypot(dx, dy)
-        step_count = round(distance / self.speed / self.interval)
+        distance = math.hypot(
+            self.target[0] - self.init_pos[0],
+            self.target[1] - self.init_pos[1],
+        )
+        step_count = max(1, round(distance / self.speed / self.interval))
+        path: list[tuple[int, int]] = [
+            tuple(pos)
+            for pos in np.linspace(self.init_pos, self.target, step_count + 1)
+            .astype(int)
+            .tolist()
+        ]
         self.progress = (step_count, 0)
+        trigger_event = TaskManager.trigger_event
+        sleep = asyncio.sleep
+        now = asyncio.get_running_loop().time
+        start_time = now()
         for i in range(1, step_count):
             if not self.running:
                 return
-            new_pos = (
-                int(self.init_pos[0] + dx * i / step_count),
-                int(self.init_pos[1] + dy * i / step_count),
-            )
-            TaskManager.trigger_event(WanderEvent(new_pos))
-            await asyncio.sleep(self.interval)
+            trigger_event(WanderEvent(path[i]))
+            await sleep(start_time + i * self.interval - now())
             self.progress = (step_count, i)
-        TaskManager.trigger_event(WanderEvent(new_pos))
+        TaskManager.trigger_event(WanderEvent(path[-1]))
         self.progress = (step_count, step_count)
 
 
@@ -67,7 +77,7 @@ class Plugin(BasePlugin):
         self.bored_interval = (80, 200)
         self.bored_timer = QTimer()
         self.bored_timer.timeout.connect(self.emit_bored)
-        self.bored_timer.start(random.randrange(*self.bored_interval))
+        self.bored_timer.start(random.randrange(*self.bored_interval) * 1e3)
 
         self.wander_range = (100, 300)
         self.wander_interval = (30, 60)
@@ -94,18 +104,15 @@ class Plugin(BasePlugin):
         current_pos: tuple[int, int] = self.pet.pos().toTuple()
         direction = random.random() * math.pi * 2
         dist = random.randint(*self.wander_range)
+        max_x, max_y = self.screen_range
+        x = current_pos[0] + dist * math.cos(direction)
+        y = current_pos[1] + dist * math.sin(direction)
         target_pos = (
-            min(
-                max(0, current_pos[0] + dist * math.cos(direction)),
-                self.screen_range[0],
-            ),
-            min(
-                max(0, current_pos[1] + dist * math.sin(direction)),
-                self.screen_range[1],
-            ),
+            0 if x < 0 else max_x if x > max_x else x,
+            0 if y < 0 else max_y if y > max_y else y,
         )
 
-        self.add_task(WanderTask(self.pet.pos().toTuple(), target_pos))
+        self.add_task(WanderTask(current_pos, target_pos))
         self.wander_timer.start(random.randrange(*self.wander_interval) * 1e3)
 
     def on_event(self, e):
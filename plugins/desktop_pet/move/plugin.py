@@ -6,12 +6,13 @@ import asyncio
 from dataclasses import dataclass
 import math
 import pathlib
+import numpy as np
 from typing import Literal, cast
 from PySide6.QtCore import QPoint
 from PySide6.QtWidgets import QApplication
 
 
-@dataclass
+@dataclass(slots=True)
 class MoveEvent(Event):
     tags = ["move"]
 
@@ -24,6 +25,8 @@ class MoveEvent(Event):
 
 
 class MoveTask(Task):
+    __slots__ = ("target", "mode", "init_pos", "progress", "running")
+
     speed = {
         "walk": 200,
         "run": 500,
@@ -51,22 +54,29 @@ class MoveTask(Task):
             self.running = False
 
     async def execute(self):
-        dx = self.target[0] - self.init_pos[0]
-        dy = self.target[1] - self.init_pos[1]
-        distance = math.hypot(dx, dy)
-        step_count = round(distance / self.speed[self.mode] / self.interval)
+        distance = math.hypot(
+            self.target[0] - self.init_pos[0],
+            self.target[1] - self.init_pos[1],
+        )
+        step_count = max(1, round(distance / self.speed[self.mode] / self.interval))
+        path: list[tuple[int, int]] = [
+            tuple(pos)
+            for pos in np.linspace(self.init_pos, self.target, step_count + 1)
+            .astype(int)
+            .tolist()
+        ]
         self.progress = (step_count, 0)
+        trigger_event = TaskManager.trigger_event
+        sleep = asyncio.sleep
+        now = asyncio.get_running_loop().time
+        start_time = now()
         for i in range(1, step_count):
             if not self.running:
                 return
-            new_pos = (
-                int(self.init_pos[0] + dx * i / step_count),
-                int(self.init_pos[1] + dy * i / step_count),
-            )
-            TaskManager.trigger_event(MoveEvent(new_pos, False))
-            await asyncio.sleep(self.interval)
+            trigger_event(MoveEvent(path[i], False))
+            await sleep(start_time + i * self.interval - now())
             self.progress = (step_count, i)
-        TaskManager.trigger_event(MoveEvent(new_pos, True))
+        TaskManager.trigger_event(MoveEvent(path[-1], True))
         self.progress = (step_count, step_count)
 
     def execute_info(self):
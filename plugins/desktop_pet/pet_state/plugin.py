@@ -3,6 +3,7 @@ from framework.event import Event, PlainEvent
 from plugins.core.plugin import MarkerEvent
 from typing import TypedDict
 from dataclasses import dataclass
+from bisect import bisect_left
 
 
 class PetState(TypedDict):
@@ -46,8 +47,13 @@ PET_STATE_DESC_MAPPER = {
     },
 }
 
+PET_STATE_DESC_LEVELS = {
+    name: tuple(zip(*sorted(mapper.items())))
+    for name, mapper in PET_STATE_DESC_MAPPER.items()
+}
+
 
-@dataclass
+@dataclass(slots=True)
 class ModifyPetStateEvent(Event):
     state_name: str
     delta: int
@@ -79,42 +85,32 @@ class Plugin(BasePlugin):
             case MarkerEvent("mood", data):
                 self.trigger_event(ModifyPetStateEvent("mood", int(data)))
 
+    @staticmethod
+    def state_level(name: str, value: int):
+        return bisect_left(PET_STATE_DESC_LEVELS[name][0], value) - 1
+
     def state_desc(self, name: str):
-        value = self.state[name]
-        for lb, desc in PET_STATE_DESC_MAPPER[name].items():
-            if value > lb:
-                return desc
+        level = self.state_level(name, self.state[name])
+        if level >= 0:
+            return PET_STATE_DESC_LEVELS[name][1][level]
 
     @staticmethod
     def state_modify_check(name: str, value: int):
-        return min(
-            max(
-                value,
-                PET_STATE_RANGE[name][0],
-            ),
-            PET_STATE_RANGE[name][1],
-        )
+        lower, upper = PET_STATE_RANGE[name]
+        return upper if value > upper else lower if value < lower else value
 
     def modify_state(self, name: str, delta: int):
         if delta == 0:
             return
 
-        prev_desc = self.state_desc(name)
+        prev_level = self.state_level(name, self.state[name])
         self.state[name] = self.state_modify_check(name, self.state[name] + delta)
-        new_desc = self.state_desc(name)
-
-        if delta > 0:
-            base_text = f'Your "{name}" state value increased.'
-        elif delta < 0:
-            base_text = f'Your "{name}" state value decreased.'
-
-        if new_desc != prev_desc:
-            extra_text = (
-                f'Your "{name}" state changes from "{prev_desc}" to "{new_desc}"'
+        new_level = self.state_level(name, self.state[name])
+
+        if new_level != prev_level:
+            descs = PET_STATE_DESC_LEVELS[name][1]
+            self.trigger_event(
+                PlainEvent(
+                    f'Your "{name}" state changes from "{descs[prev_level]}" to "{descs[new_level]}"'
+                )
             )
-        else:
-            extra_text = ""
-
-        # return base_text + extra_text
-        if len(extra_text):
-            self.trigger_event(PlainEvent(extra_text))
@@ -1,7 +1,7 @@
 from framework.plugin import BasePlugin
 from framework.config import BaseConfig
 from dataclasses import dataclass
-from datetime import datetime
+import time
 import requests
 
 @dataclass
@@ -23,7 +23,7 @@ class Plugin(BasePlugin):
         d = {}
         config: Config = self.get_config()
         if config.time:
-            d["Time"] = str(datetime.now())
+            d["Time"] = time.strftime("%Y-%m-%d %H:%M:%S")
         if config.location:
             d["Location"] = self.location
         if len(d) != 0: